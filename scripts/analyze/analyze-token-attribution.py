@@ -6,51 +6,87 @@ Usage:
     hegel analyze --debug START..END --json | ./scripts/analyze-token-attribution.py
 
 Identifies patterns in zero-token phases to distinguish bugs from legitimate cases.
+Streams the input when ijson is installed; otherwise falls back to json.load.
 """
 
+import heapq
 import json
 import sys
 from collections import defaultdict
-from datetime import datetime
+from operator import itemgetter
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
-def parse_timestamp(ts):
-    """Parse RFC3339 timestamp, handle both Z and +00:00 formats"""
-    if ts.endswith('Z'):
-        ts = ts[:-1] + '+00:00'
-    return datetime.fromisoformat(ts)
 
+def iter_phases(stream):
+    """Yield phase dicts from a binary JSON array stream, streaming when ijson is available"""
+    if ijson is not None:
+        return ijson.items(stream, 'item', use_float=True)
+    return iter(json.load(stream))
 
-def main():
-    # Read JSON from stdin
-    data = json.load(sys.stdin)
 
-    # Aggregate statistics
-    total_phases = len(data)
-    zero_token_phases = [p for p in data if p['tokens_attributed'] == 0]
-    nonzero_token_phases = [p for p in data if p['tokens_attributed'] > 0]
+def main():
+    # Aggregate statistics in a single pass over the phases read from stdin
+    total_phases = 0
+    zero_count_total = 0
 
     # Group by various dimensions
-    by_workflow = defaultdict(list)
-    by_phase_name = defaultdict(list)
-    zero_by_archived = {'archived': [], 'live': []}
-
-    for phase in data:
-        by_workflow[phase['workflow_id']].append(phase)
-        by_phase_name[phase['phase_name']].append(phase)
-
-        if phase['tokens_attributed'] == 0:
-            if phase['is_archived']:
-                zero_by_archived['archived'].append(phase)
-            else:
-                zero_by_archived['live'].append(phase)
-
-    # Calculate duration thresholds to identify suspicious phases
-    # (Long duration + 0 tokens = probably a bug)
-    suspicious_phases = [
-        p for p in zero_token_phases
-        if p['duration_seconds'] > 300  # >5 minutes with 0 tokens
-    ]
+    by_workflow_total = defaultdict(int)
+    by_workflow_zero = defaultdict(int)
+    by_phase_name_total = defaultdict(int)
+    by_phase_name_zero = defaultdict(int)
+    zero_by_archived = {'archived': 0, 'live': 0}
+
+    # Long duration + 0 tokens = probably a bug
+    # Only the top 10 are printed, so keep a bounded min-heap of
+    # (duration, -index, workflow_id, phase_name); -index keeps input order on ties
+    suspicious_count = 0
+    suspicious_top = []
+
+    # Transcript matching details for live phases (archived ones lack them)
+    live_count = 0
+    live_transcript_stats = []
+
+    for phase in iter_phases(sys.stdin.buffer):
+        total_phases += 1
+        tokens = phase['tokens_attributed']
+        wid = phase['workflow_id']
+        phase_name = phase['phase_name']
+        is_archived = phase['is_archived']
+
+        # Zero test computed once and reused by every aggregate below
+        is_zero = tokens == 0
+        by_workflow_total[wid] += 1
+        by_workflow_zero[wid] += is_zero
+        by_phase_name_total[phase_name] += 1
+        by_phase_name_zero[phase_name] += is_zero
+
+        if is_zero:
+            zero_count_total += 1
+            zero_by_archived['archived' if is_archived else 'live'] += 1
+            duration = phase['duration_seconds']
+            if duration > 300:  # >5 minutes with 0 tokens
+                suspicious_count += 1
+                entry = (duration, -total_phases, wid, phase_name)
+                if len(suspicious_top) < 10:
+                    heapq.heappush(suspicious_top, entry)
+                elif entry > suspicious_top[0]:
+                    heapq.heapreplace(suspicious_top, entry)
+
+        if not is_archived:
+            live_count += 1
+            if 'transcript_events_examined' in phase:
+                live_transcript_stats.append((
+                    phase_name,
+                    phase.get('transcript_events_examined', 0),
+                    phase.get('transcript_events_matched', 0),
+                    tokens,
+                ))
+
+    nonzero_count_total = total_phases - zero_count_total
 
     # Print analysis
     print("=" * 80)
@@ -59,37 +95,37 @@ def main():
     print()
 
     print(f"Total phases analyzed: {total_phases}")
-    print(f"Zero-token phases:     {len(zero_token_phases)} ({len(zero_token_phases)/total_phases*100:.1f}%)")
-    print(f"Non-zero token phases: {len(nonzero_token_phases)} ({len(nonzero_token_phases)/total_phases*100:.1f}%)")
+    print(f"Zero-token phases:     {zero_count_total} ({zero_count_total/total_phases*100:.1f}%)")
+    print(f"Non-zero token phases: {nonzero_count_total} ({nonzero_count_total/total_phases*100:.1f}%)")
     print()
 
     print("Zero-token breakdown:")
-    print(f"  Archived phases: {len(zero_by_archived['archived'])}")
-    print(f"  Live phases:     {len(zero_by_archived['live'])}")
+    print(f"  Archived phases: {zero_by_archived['archived']}")
+    print(f"  Live phases:     {zero_by_archived['live']}")
     print()
 
-    print(f"Suspicious phases (>5min duration, 0 tokens): {len(suspicious_phases)}")
-    if suspicious_phases:
+    print(f"Suspicious phases (>5min duration, 0 tokens): {suspicious_count}")
+    if suspicious_count:
         print()
         print("Top 10 suspicious phases by duration:")
-        suspicious_sorted = sorted(suspicious_phases, key=lambda p: p['duration_seconds'], reverse=True)
-        for phase in suspicious_sorted[:10]:
-            duration_mins = phase['duration_seconds'] / 60
-            print(f"  {phase['workflow_id']} | {phase['phase_name']:15s} | {duration_mins:7.1f} min | 0 tokens")
+        for duration, _, wid, phase_name in sorted(suspicious_top, reverse=True):
+            duration_mins = duration / 60
+            print(f"  {wid} | {phase_name:15s} | {duration_mins:7.1f} min | 0 tokens")
     print()
 
     # Phase name analysis
     print("Zero-token rate by phase name:")
     phase_stats = []
-    for phase_name, phases in by_phase_name.items():
-        total = len(phases)
-        zero_count = sum(1 for p in phases if p['tokens_attributed'] == 0)
+    for phase_name, total in by_phase_name_total.items():
+        zero_count = by_phase_name_zero[phase_name]
         zero_rate = zero_count / total * 100 if total > 0 else 0
         phase_stats.append((phase_name, total, zero_count, zero_rate))
 
-    phase_stats.sort(key=lambda x: x[3], reverse=True)  # Sort by zero rate
-    for phase_name, total, zero_count, zero_rate in phase_stats:
-        print(f"  {phase_name:15s}: {zero_count:3d}/{total:3d} ({zero_rate:5.1f}%)")
+    phase_stats.sort(key=itemgetter(3), reverse=True)  # Sort by zero rate
+    sys.stdout.write("".join(
+        f"  {phase_name:15s}: {zero_count:3d}/{total:3d} ({zero_rate:5.1f}%)\n"
+        for phase_name, total, zero_count, zero_rate in phase_stats
+    ))
     print()
 
     # Workflow-level analysis
@@ -97,14 +133,14 @@ def main():
     workflows_mixed = []
     workflows_all_nonzero = []
 
-    for wid, phases in by_workflow.items():
-        zero_count = sum(1 for p in phases if p['tokens_attributed'] == 0)
-        if zero_count == len(phases):
+    for wid, total in by_workflow_total.items():
+        zero_count = by_workflow_zero[wid]
+        if zero_count == total:
             workflows_all_zero.append(wid)
         elif zero_count == 0:
             workflows_all_nonzero.append(wid)
         else:
-            workflows_mixed.append((wid, zero_count, len(phases)))
+            workflows_mixed.append((wid, zero_count, total))
 
     print("Workflow-level patterns:")
     print(f"  All phases have 0 tokens:    {len(workflows_all_zero)} workflows")
@@ -113,15 +149,12 @@ def main():
     print()
 
     # Live phase transcript matching (if any live phases present)
-    live_phases = [p for p in data if not p['is_archived']]
-    if live_phases:
+    if live_count:
         print("Live phase transcript matching:")
-        for phase in live_phases:
-            if 'transcript_events_examined' in phase:
-                examined = phase.get('transcript_events_examined', 0)
-                matched = phase.get('transcript_events_matched', 0)
-                tokens = phase['tokens_attributed']
-                print(f"  {phase['phase_name']:15s}: examined {examined:3d}, matched {matched:3d}, tokens {tokens:5d}")
+        sys.stdout.write("".join(
+            f"  {phase_name:15s}: examined {examined:3d}, matched {matched:3d}, tokens {tokens:5d}\n"
+            for phase_name, examined, matched, tokens in live_transcript_stats
+        ))
         print()
 
     # Summary recommendations
@@ -129,7 +162,7 @@ def main():
     print("RECOMMENDATIONS")
     print("=" * 80)
 
-    if len(suspicious_phases) > 10:
+    if suspicious_count > 10:
         print("⚠️  Many long-duration phases with 0 tokens detected.")
         print("    This suggests a systematic token attribution bug.")
         print("    Next steps:")
@@ -143,7 +176,7 @@ def main():
         print("    Focus debugging on workflows with all-zero phases.")
         print()
 
-    if len(zero_by_archived['live']) > 0:
+    if zero_by_archived['live'] > 0:
         print("⚠️  Live phases with 0 tokens detected - use --verbose to debug")
 
 
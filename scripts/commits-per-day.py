@@ -2,36 +2,80 @@
 """Count commits per day from git history"""
 
 import argparse
+import json
 import subprocess
+import sys
 from collections import Counter
 
-def get_commits_per_day():
-    """Get commit counts grouped by day"""
-    result = subprocess.run(
-        ['git', 'log', '--date=short', '--pretty=format:%ad'],
-        capture_output=True,
-        text=True,
-        check=True
-    )
+CACHE_NAME = 'commits-per-day.cache'
+
+def git_output(*args):
+    """Run a git command and return its stripped stdout"""
+    result = subprocess.run(['git', *args], capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def get_commits_per_day(revision_range=None, since=None):
+    """Get commit counts grouped by day, optionally limited to a revision range or date window"""
+    cmd = ['git', 'log', '--date=short', '--pretty=format:%ad']
+    if since:
+        cmd.append(f'--since={since}')
+    if revision_range:
+        cmd.append(revision_range)
+
+    # Stream dates straight into the Counter instead of materializing the log
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+        counts = Counter(line.rstrip('\n') for line in proc.stdout)
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    return counts
+
+def get_cached_commits_per_day():
+    """Get commit counts, reusing the cache in .git when HEAD is unchanged or a descendant"""
+    head = git_output('rev-parse', 'HEAD')
+    cache_path = git_output('rev-parse', '--git-path', CACHE_NAME)
+
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+        cached_head, counts = cache['head'], Counter(cache['counts'])
+    except (OSError, ValueError, KeyError, TypeError):
+        cached_head, counts = None, None
+
+    if cached_head == head:
+        return counts
+
+    is_ancestor = cached_head is not None and subprocess.run(
+        ['git', 'merge-base', '--is-ancestor', cached_head, head],
+        capture_output=True
+    ).returncode == 0
+
+    if is_ancestor:
+        # Only walk commits added since the cached HEAD
+        counts.update(get_commits_per_day(f'{cached_head}..{head}'))
+    else:
+        counts = get_commits_per_day(head)
 
-    dates = result.stdout.strip().split('\n')
-    return Counter(dates)
+    try:
+        with open(cache_path, 'w') as f:
+            json.dump({'head': head, 'counts': counts}, f)
+    except OSError:
+        pass  # Cache is an optimization; read-only .git is fine
 
-def print_bars(sorted_days):
-    """Print ASCII bar graph with up to 10 X's per day, wrapping on month boundaries"""
-    if not sorted_days:
-        return
+    return counts
 
+def split_month_chunks(sorted_days):
+    """Split sorted (date, count) pairs into month chunks, wrapping on the first day's day-of-month"""
     # Get first commit day to determine wrap boundaries
     first_date = sorted_days[0][0]
-    first_day = int(first_date.split('-')[2])
+    first_day = first_date[8:10]
 
     # Split into month chunks (wrapping on the anniversary day)
     chunks = []
     current_chunk = []
 
     for date, count in sorted_days:
-        day = int(date.split('-')[2])
+        day = date[8:10]  # YYYY-MM-DD, compared as text
 
         # Start new chunk if we've reached the wrap day and we have data
         if current_chunk and day == first_day:
@@ -44,51 +88,80 @@ def print_bars(sorted_days):
     if current_chunk:
         chunks.append(current_chunk)
 
-    # Print each chunk
+    return chunks
+
+def print_bars(sorted_days, wrap=True):
+    """Print ASCII bar graph with up to 10 X's per day, optionally wrapping on month boundaries"""
+    if not sorted_days:
+        return
+
+    chunks = split_month_chunks(sorted_days) if wrap else [sorted_days]
+
+    # Render each chunk, then write the whole graph at once
+    lines = []
     for i, chunk in enumerate(chunks):
         if i > 0:
-            print()  # Blank line between chunks
+            lines.append("")  # Blank line between chunks
 
-        max_count = max(count for _, count in chunk)
+        # Counts scaled by 10 so row thresholds compare as exact integers
+        counts = [count * 10 for _, count in chunk]
+        max_count = max(counts) // 10
 
-        # Print bars vertically (10 rows tall)
+        # Bars drawn vertically (10 rows tall) into one reused row buffer.
+        # Thresholds only fall as rows descend, so a column never reverts
+        # from X to blank and the buffer is never cleared.
+        buf = bytearray(b" " * (2 * len(counts)))
         for row in range(10, 0, -1):
-            threshold = (row / 10) * max_count
-            line = ""
-            for _, count in chunk:
+            threshold = row * max_count
+            for j, count in enumerate(counts):
                 if count >= threshold:
-                    line += "X "
-                else:
-                    line += "  "
-            print(line)
+                    buf[2 * j] = 0x58  # "X"
+            lines.append(buf.decode("ascii"))
 
-        # Print separator and dates
+        # Separator and dates
         width = len(chunk) * 2
-        print("─" * width)
+        lines.append("─" * width)
 
-        # Print first and last date aligned to ends
+        # First and last date aligned to ends
         chunk_first = chunk[0][0]
         chunk_last = chunk[-1][0]
         spacing = " " * (width - len(chunk_first) - len(chunk_last))
-        print(f"{chunk_first}{spacing}{chunk_last}")
+        lines.append(f"{chunk_first}{spacing}{chunk_last}")
+
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     parser = argparse.ArgumentParser(description='Count commits per day from git history')
     parser.add_argument('--bars', action='store_true', help='Show ASCII bar graph')
+    parser.add_argument('--wrap', action=argparse.BooleanOptionalAction, default=True,
+                        help='Wrap --bars graph into month chunks (default: on)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Skip .git/{CACHE_NAME} on full-history runs '
+                             '(windowed --since runs, including the --bars default, never use it)')
+    parser.add_argument('--since', default=None,
+                        help="Only count commits since this date (default: '1 year ago' with --bars, "
+                             "full history otherwise; pass '' for full history)")
     args = parser.parse_args()
 
-    commits_per_day = get_commits_per_day()
+    since = args.since if args.since is not None else ('1 year ago' if args.bars else '')
+
+    if since:
+        # Windowed walks are cheap for git to bound and bypass the full-history cache
+        commits_per_day = get_commits_per_day(since=since)
+    elif args.no_cache:
+        commits_per_day = get_commits_per_day()
+    else:
+        commits_per_day = get_cached_commits_per_day()
 
     # Sort by date
     sorted_days = sorted(commits_per_day.items())
 
     if args.bars:
-        print_bars(sorted_days)
+        print_bars(sorted_days, wrap=args.wrap)
         print()
     else:
         # Print counts
-        for date, count in sorted_days:
-            print(f"  {count:3d} {date}")
+        sys.stdout.write("".join(f"  {count:3d} {date}\n" for date, count in sorted_days))
         print()
 
     # Summary